@@ -5,21 +5,174 @@ The sum of the primes below 10 is 2 + 3 + 5 + 7 = 17.
 Find the sum of all the primes below two million.
 
 """
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import compress
+from math import isqrt
+from multiprocessing import shared_memory
+import os
+
+# Bytes per sieve block - one byte per odd number, sized to sit in L2.
+SEGMENT_SIZE = 2**18
+
+# Numbers covered by each process pool task (a run of sieve blocks).
+TASK_SIZE = 2**26
+
+# Worker-side view of the base primes, attached by _init_worker.
+_base_memory = None
+_base_primes = None
+
+
+def small_primes(limit):
+    """Returns a list of the primes below limit, using a plain odd-only
+        sieve. Used for the base primes of the segmented sieve."""
+    if limit <= 2:
+        return []
+    sieve = bytearray([1]) * (limit // 2)
+    sieve[0] = 0
+    for i in range(1, (isqrt(limit - 1) - 1) // 2 + 1):
+        if sieve[i]:
+            p = 2 * i + 1
+            start = p * p // 2
+            sieve[start::p] = bytes(len(range(start, len(sieve), p)))
+    return [2] + list(compress(range(1, limit, 2), sieve))
+
+
+def sieve_segment(low, high, base_primes):
+    """Returns a bytearray where index j flags whether low + 2*j is prime,
+        covering the odd numbers in [low, high). low must be odd and
+        base_primes must hold the odd primes up to sqrt(high)."""
+    size = (high - low + 1) // 2
+    segment = bytearray([1]) * size
+    if low == 1 and size:
+        segment[0] = 0
+    for p in base_primes:
+        start = p * p
+        if start >= high:
+            break
+        if start < low:
+            start = (low + p - 1) // p * p
+            if start % 2 == 0:
+                start += p
+        start = (start - low) // 2
+        segment[start::p] = bytes(len(range(start, size, p)))
+    return segment
+
+
+def gen_segments(limit, segment_size=SEGMENT_SIZE):
+    """Yields (low, segment) pairs covering the odd numbers below limit,
+        see sieve_segment."""
+    limit = int(limit)
+    base_primes = small_primes(isqrt(max(limit - 1, 0)) + 1)[1:]
+    for low in range(1, limit, 2 * segment_size):
+        yield low, sieve_segment(low, min(low + 2 * segment_size, limit),
+                                 base_primes)
+
 
 def gen_primes(limit=2e6):
-    """Generates primes, based on Sieve of Eratosthenes
-        http://code.activestate.com/recipes/117119/
-    """
-    factorable = {}
-    for i in range(2, int(limit)):
-        if i not in factorable:
-            yield i
-            factorable[i*i] = [i]
+    """Generates primes below limit, based on a segmented Sieve of
+        Eratosthenes over odd numbers."""
+    if limit > 2:
+        yield 2
+    for low, segment in gen_segments(limit):
+        yield from compress(range(low, low + 2 * len(segment), 2), segment)
+
+
+def sum_primes_below(limit):
+    """Returns the sum of the primes below limit."""
+    total = 2 if limit > 2 else 0
+    for low, segment in gen_segments(limit):
+        total += sum(compress(range(low, low + 2 * len(segment), 2), segment))
+    return total
+
+
+def count_primes_below(limit):
+    """Returns the number of primes below limit."""
+    count = 1 if limit > 2 else 0
+    for _, segment in gen_segments(limit):
+        count += segment.count(1)
+    return count
+
+
+def _init_worker(name, count):
+    """Attaches a pool worker to the shared base prime array."""
+    global _base_memory, _base_primes
+    _base_memory = shared_memory.SharedMemory(name=name)
+    _base_primes = _base_memory.buf[:count * 4].cast('I')
+
+
+def _sieve_task(kind, low, high):
+    """Sieves the odd numbers in [low, high) block by block and returns
+        their sum, count or primes (as an array), depending on kind."""
+    result = array('Q') if kind == 'primes' else 0
+    for start in range(low, high, 2 * SEGMENT_SIZE):
+        stop = min(start + 2 * SEGMENT_SIZE, high)
+        segment = sieve_segment(start, stop, _base_primes)
+        if kind == 'count':
+            result += segment.count(1)
         else:
-            for j in factorable[i]:
-                factorable.setdefault(i+j, []).append(j)
-            del factorable[i]
+            primes = compress(range(start, stop, 2), segment)
+            if kind == 'sum':
+                result += sum(primes)
+            else:
+                result.extend(primes)
+    return result
+
+
+def parallel_segments(limit, kind, workers=None):
+    """Yields (low, high, result) for each _sieve_task over the odd numbers
+        in [low, high), covering those below limit in ascending order. Tasks run across a process pool; the base
+        primes are computed once and shared with workers through shared
+        memory rather than pickled into every task."""
+    limit = int(limit)
+    workers = workers or os.cpu_count()
+    base_primes = array('I', small_primes(isqrt(max(limit - 1, 0)) + 1)[1:])
+    memory = shared_memory.SharedMemory(
+        create=True, size=max(len(base_primes) * 4, 1))
+    try:
+        memory.buf[:len(base_primes) * 4] = base_primes.tobytes()
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(memory.name, len(base_primes))
+                                 ) as pool:
+            # bound the in-flight tasks so ordered streams stay small
+            pending = deque()
+            for low in range(1, limit, TASK_SIZE):
+                high = min(low + TASK_SIZE, limit)
+                pending.append((low, high, pool.submit(
+                    _sieve_task, kind, low, high)))
+                if len(pending) > 2 * workers:
+                    low, high, task = pending.popleft()
+                    yield low, high, task.result()
+            while pending:
+                low, high, task = pending.popleft()
+                yield low, high, task.result()
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+def parallel_gen_primes(limit=2e6, workers=None):
+    """Generates primes below limit in order, sieving across processes."""
+    if limit > 2:
+        yield 2
+    for _, _, primes in parallel_segments(limit, 'primes', workers):
+        yield from primes
+
+
+def parallel_sum_primes_below(limit, workers=None):
+    """Returns the sum of the primes below limit, sieving across
+        processes."""
+    return (2 if limit > 2 else 0) + sum(
+        total for _, _, total in parallel_segments(limit, 'sum', workers))
+
+
+def parallel_count_primes_below(limit, workers=None):
+    """Returns the number of primes below limit, sieving across
+        processes."""
+    return (1 if limit > 2 else 0) + sum(
+        count for _, _, count in parallel_segments(limit, 'count', workers))
 
 
 if __name__ == '__main__':
-    print(sum(gen_primes(2e6)))
+    print(sum_primes_below(2e6))
@@ -29,8 +29,31 @@ The product of these numbers is 26 × 63 × 78 × 14 = 1788696.
 What is the greatest product of four adjacent numbers in the same
 direction (up, down, left, right, or diagonally) in the 20×20 grid
 """
+from concurrent.futures import ProcessPoolExecutor
 import operator
-from functools import reduce
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Line directions as (dy, dx) steps from the starting cell, in the order
+# ties are reported.
+DIRECTIONS = {
+    'down-right': (1, 1),
+    'right': (0, 1),
+    'down': (1, 0),
+    'down-left': (1, -1),
+}
+
+# Line starts handed to the NumPy kernel at a time (rows are cut to fit).
+BAND_CELLS = 2**21
+
+# Line starts per process pool task when scanning a grid file.
+TILE_CELLS = 2**24
+
+# Worker-side memory map of the grid file, opened by _init_worker.
+_grid = None
 
 
 GRID = """
@@ -56,27 +79,146 @@ GRID = """
     01 70 54 71 83 51 54 69 16 92 33 48 61 43 52 01 89 19 67 48
 """
 
-def search_grid(size):
-    """Searches grid for consecutive ints that have the largest
-        product."""
-    best = 0
-    ranges = {-1: (3, 20), 0: (0, 20), 1: (0, 16)}
-    for mask in [(1, 1), (1, 0), (0, 1), (1, -1)]:
-        for i in range(*ranges[mask[0]]):
-            for j in range(*ranges[mask[1]]):
-                prod = reduce(operator.mul, get_mask(mask, i, j, size))
-                best = max(best, prod)
-    return best
+def parse_grid(text):
+    """Parses whitespace separated rows of ints, once, into an ndarray
+        (or a list of lists when NumPy is unavailable)."""
+    rows = [line.split() for line in text.strip().split("\n")]
+    assert all(len(row) == len(rows[0]) for row in rows), "Ragged grid."
+    if numpy is None:
+        return [[int(cell) for cell in row] for row in rows]
+    return numpy.array(rows, dtype=numpy.int64)
 
-def get_mask(mask, x, y, size):
-    """Returns an array of ints for a given locataion, mask shape,
-        and size."""
-    ints = []
+
+def line_windows(shape, size, step):
+    """Returns the (height, width, first x) of the block of cells where a
+        line of size cells in direction step can start."""
+    dy, dx = step
+    height = shape[0] - (size - 1) * dy
+    width = shape[1] - (size - 1) * abs(dx)
+    return height, width, (size - 1 if dx < 0 else 0)
+
+
+def product_dtype(grid, size):
+    """Returns int64 when no product of size cells can overflow it, else
+        object (exact Python ints). Small integer dtypes are settled from
+        their bounds; otherwise the grid is scanned in bands so
+        memory-mapped grids are never copied whole."""
+    info = numpy.iinfo(grid.dtype)
+    if max(-int(info.min), int(info.max)) ** size < 2**63:
+        return numpy.int64
+    peak = 0
+    rows = max(1, BAND_CELLS // max(grid.shape[1], 1))
+    for y in range(0, grid.shape[0], rows):
+        band = grid[y:y + rows]
+        if band.size:
+            peak = max(peak, abs(int(band.min())), abs(int(band.max())))
+    return numpy.int64 if peak ** size < 2**63 else object
+
+
+def _best_in_band(grid, size, step, top, bottom, dtype):
+    """NumPy kernel: multiplies size strided slices to get the product of
+        every line starting on rows [top, bottom), returning the best as
+        (value, (y, x)). Slices are cast to dtype first, so unsigned and
+        narrow grids multiply in dtype too."""
+    dy, dx = step
+    _, width, first_x = line_windows(grid.shape, size, step)
+    prods = numpy.ones((bottom - top, width), dtype)
     for i in range(size):
-        ints.append(int(GRID[y + mask[1] * i][x + mask[0] * i]))
-    return ints
+        x = first_x + i * dx
+        cells = grid[top + i * dy:bottom + i * dy, x:x + width]
+        prods *= cells.astype(dtype, copy=False)
+    y, x = numpy.unravel_index(numpy.argmax(prods), prods.shape)
+    return int(prods[y, x]), (top + int(y), first_x + int(x))
+
+
+def _best_in_lists(grid, size, step, top, bottom, dtype=None):
+    """Pure Python version of _best_in_band over a list of lists."""
+    dy, dx = step
+    _, width, first_x = line_windows((len(grid), len(grid[0])), size, step)
+    best = None
+    for y in range(top, bottom):
+        prods = [1] * width
+        for i in range(size):
+            x = first_x + i * dx
+            cells = grid[y + i * dy][x:x + width]
+            prods = list(map(operator.mul, prods, cells))
+        value = max(prods)
+        if best is None or value > best[0]:
+            best = value, (y, first_x + prods.index(value))
+    return best
+
+
+def best_line(grid, size, top=0, bottom=None, dtype=None):
+    """Returns (product, (y, x), direction) of the line of size cells with
+        the greatest product, among lines starting on rows [top, bottom).
+        Ties go to the earlier direction, then the first cell in row
+        order."""
+    shape = (len(grid), len(grid[0]))
+    bottom = shape[0] if bottom is None else bottom
+    if numpy is not None and dtype is None:
+        dtype = product_dtype(grid, size)
+    rows = max(1, BAND_CELLS // max(shape[1], 1))
+    best = None
+    for name, step in DIRECTIONS.items():
+        height, width, _ = line_windows(shape, size, step)
+        if width <= 0 or min(bottom, height) <= top:
+            continue
+        if numpy is None:
+            bands = [(top, min(bottom, height))]
+            kernel = _best_in_lists
+        else:
+            bands = [(y, min(y + rows, bottom, height))
+                     for y in range(top, min(bottom, height), rows)]
+            kernel = _best_in_band
+        for band in bands:
+            value, pos = kernel(grid, size, step, *band, dtype)
+            if best is None or value > best[0]:
+                best = value, pos, name
+    return best
+
+
+def _init_worker(path):
+    """Memory-maps the grid file once per pool worker."""
+    global _grid
+    _grid = numpy.load(path, mmap_mode='r')
+
+
+def _scan_tile(size, top, bottom):
+    """best_line over one band of starting rows; the slices it takes reach
+        size-1 rows past bottom, which is the band's halo. The product
+        dtype is picked from the band and its halo only."""
+    dtype = product_dtype(_grid[top:bottom + size - 1], size)
+    return best_line(_grid, size, top, bottom, dtype)
+
+
+def search_grid_file(path, size, workers=None):
+    """best_line for a grid saved with numpy.save (any integer dtype),
+        memory-mapped and scanned as row bands across a process pool.
+        The parent only reads the header; workers size each band's
+        products themselves. Gives exactly the single-process result,
+        ties included."""
+    grid = numpy.load(path, mmap_mode='r')
+    rows = max(1, TILE_CELLS // max(grid.shape[1], 1))
+    order = list(DIRECTIONS)
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(path,)) as pool:
+        tiles = [pool.submit(_scan_tile, size, top, top + rows)
+                 for top in range(0, grid.shape[0], rows)]
+        found = [tile.result() for tile in tiles if tile.result()]
+    if not found:
+        return None
+    return min(found, key=lambda best: (-best[0], order.index(best[2]),
+                                        best[1]))
+
+
+def search_grid(size, grid=None):
+    """Searches grid for consecutive ints that have the largest
+        product."""
+    if grid is None:
+        grid = parse_grid(GRID)
+    best = best_line(grid, size)
+    return 0 if best is None else int(best[0])
 
 
 if __name__ == '__main__':
-    GRID = list(line.strip().split() for line in GRID.strip().split("\n"))
     print(search_grid(4))
@@ -14,29 +14,126 @@ unless it is divisible by 400.
 How many Sundays fell on the first of the month during the twentieth
 century (1 Jan 1901 to 31 Dec 2000)?
 """
+from functools import lru_cache
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 MONTHS = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
 
+# Weekdays as returned by weekday().
+SUNDAY, MONDAY, TUESDAY, WEDNESDAY, THURSDAY, FRIDAY, SATURDAY = range(7)
+
+# The Gregorian calendar repeats every 400 years: 146097 days, which is
+# exactly 20871 weeks, so weekdays repeat too.
+CYCLE_YEARS = 400
+CYCLE_MONTHS = 12 * CYCLE_YEARS
+
+# Sakamoto's month offsets.
+_MONTH_OFFSETS = [0, 3, 2, 5, 0, 3, 5, 1, 4, 6, 2, 4]
+
+
+def is_leap_year(year):
+    """Gregorian leap year rule."""
+    return year % 400 == 0 or (year % 4 == 0 and year % 100 != 0)
+
+def weekday(year, month, day):
+    """Returns the weekday of a date (month 1-12), Sunday being 0, using
+    Sakamoto's method. Works for any proleptic Gregorian year."""
+    if month < 3:
+        year -= 1
+    return (year + year//4 - year//100 + year//400
+            + _MONTH_OFFSETS[month - 1] + day) % 7
+
+def month_length(year, month):
+    """Days in the month (1-12) of the given year."""
+    return MONTHS[month - 1] + (month == 2 and is_leap_year(year))
+
+@lru_cache(maxsize=None)
+def _day_counts(day_of_month):
+    """For each weekday, the running count of months whose day_of_month
+    falls on it over one 400 year cycle (4800 months, starting at year
+    0). Months too short to have the day are skipped."""
+    counts = [[0] * (CYCLE_MONTHS + 1) for _ in range(7)]
+    for month in range(CYCLE_MONTHS):
+        year, month_of_year = divmod(month, 12)
+        hit = None
+        if day_of_month <= month_length(year, month_of_year + 1):
+            hit = weekday(year, month_of_year + 1, day_of_month)
+        for day in range(7):
+            counts[day][month + 1] = counts[day][month] + (day == hit)
+    return counts
+
+def _days_before(month, day, day_of_month=1):
+    """Number of months before the absolute month index
+    (12 * year + month - 1) whose day_of_month falls on weekday day."""
+    cycles, rest = divmod(month, CYCLE_MONTHS)
+    counts = _day_counts(day_of_month)[day]
+    return cycles * counts[CYCLE_MONTHS] + counts[rest]
+
+def count_month_firsts(start, end, day=SUNDAY):
+    """Given start and end dates as (year, month, day) tuples, returns how
+    many firsts of the month between them, inclusive, fall on the given
+    weekday. O(1) for any span."""
+    first = 12 * start[0] + start[1] - 1 + (start[2] > 1)
+    last = 12 * end[0] + end[1] - 1
+    if last < first:
+        return 0
+    return _days_before(last + 1, day) - _days_before(first, day)
+
+def count_weekday_days(year, end_year, day=SUNDAY, day_of_month=1):
+    """Number of months from Jan of year up to (not including) end_year
+    whose day_of_month falls on the given weekday."""
+    if end_year <= year:
+        return 0
+    return (_days_before(12 * end_year, day, day_of_month)
+            - _days_before(12 * year, day, day_of_month))
+
+@lru_cache(maxsize=None)
+def _cycle_table():
+    """All of _day_counts as one (31, 7, 4801) array, built vectorised."""
+    months = numpy.arange(CYCLE_MONTHS)
+    years, month_of_year = numpy.divmod(months, 12)
+    leap = (years % 400 == 0) | ((years % 4 == 0) & (years % 100 != 0))
+    lengths = (numpy.array(MONTHS)[month_of_year]
+               + (leap & (month_of_year == 1)))
+    shifted = years - (month_of_year < 2)
+    base = (shifted + shifted // 4 - shifted // 100 + shifted // 400
+            + numpy.array(_MONTH_OFFSETS)[month_of_year])
+    table = numpy.zeros((31, 7, CYCLE_MONTHS + 1), numpy.int64)
+    for day_of_month in range(1, 32):
+        days = (base + day_of_month) % 7
+        valid = day_of_month <= lengths
+        for day in range(7):
+            numpy.cumsum(valid & (days == day),
+                         out=table[day_of_month - 1, day, 1:])
+    return table
+
+def count_weekday_days_batch(years, end_years, days, days_of_month):
+    """count_weekday_days for whole arrays of queries in one call, returned
+    as a list. Vectorised over the cycle table when NumPy is available."""
+    if numpy is None:
+        return [count_weekday_days(*query)
+                for query in zip(years, end_years, days, days_of_month)]
+    table = _cycle_table()
+    years = numpy.asarray(years, numpy.int64)
+    end_years = numpy.maximum(numpy.asarray(end_years, numpy.int64), years)
+    rows = (numpy.asarray(days_of_month, numpy.int64) - 1,
+            numpy.asarray(days, numpy.int64))
+    start = numpy.divmod(12 * years, CYCLE_MONTHS)
+    end = numpy.divmod(12 * end_years, CYCLE_MONTHS)
+    counts = ((end[0] - start[0]) * table[rows + (CYCLE_MONTHS,)]
+              + table[rows + (end[1],)] - table[rows + (start[1],)])
+    return counts.tolist()
+
 def count_first_sundays(year, end_year):
     """Given a start and end year, returns the number of sundays
-    that fall on the first."""
-    month = 0
-    firsts = 0
-    day = 1 # Jan 1 1900 is monday, or 0
-    days_in_month = 31
-    while month < 12*(end_year-year):
-        leap_year = year%400 == 0 or (year%4 == 0 and not year%100 == 0)
-        if (month%12) == 1 and leap_year:
-            print('leap!')
-            days_in_month = 29
-        else:
-            days_in_month = MONTHS[month%12]
-        day += days_in_month
-        month += 1
-        if day % 7 == 0:
-            firsts += 1
-    return firsts
+    that fall on the first, from Jan 1 of year up to (not including)
+    end_year."""
+    return count_month_firsts((year, 1, 1), (end_year - 1, 12, 31))
 
 
 if __name__ == '__main__':
-    print(count_first_sundays(1900, 2001) - count_first_sundays(1900, 1901))
+    print(count_first_sundays(1901, 2001))
@@ -4,33 +4,159 @@ made from the product of two 2-digit numbers is 9009 = 91 × 99.
 
 Find the largest palindrome made from the product of two 3-digit
 numbers.
+
+benchmark(9), single core:
+ d           palindrome                 factors   seconds
+ 1                    9                   9 x 1     0.000
+ 2                 9009                 99 x 91     0.000
+ 3               906609               993 x 913     0.000
+ 4             99000099             9999 x 9901     0.000
+ 5           9966006699           99979 x 99681     0.001
+ 6         999000000999         999999 x 999001     0.005
+ 7       99956644665999       9998017 x 9997647     0.068
+ 8     9999000000009999     99999999 x 99990001     0.327
+ 9   999900665566009999   999980347 x 999920317    30.294
 """
 
-import math
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import multiprocessing
+import os
+import time
+
+# Palindrome halves scanned per process pool task.
+CHUNK_HALVES = 256
+
+# Worker-side shared bound: the lowest chunk index known to hold a hit.
+_best_chunk = None
+_NO_HIT = 2**62
+
+
+def palindromes(length):
+    """yields the palindromes with length digits, largest first."""
+    half = (length + 1) // 2
+    odd = length % 2
+    for i in range(10**half - 1, 10**(half - 1) - 1, -1):
+        head = str(i)
+        yield int(head + head[::-1][odd:])
+
+
+def get_factors(num, digits):
+    """returns a factor pair (a, b), a >= b, of num where both factors
+        have the given number of digits, or None. Only divisors inside
+        [10**(digits-1), 10**digits) are tried."""
+    low, high = 10**(digits - 1), 10**digits - 1
+    if len(str(num)) % 2 == 0:
+        # even length palindromes are multiples of 11, so one factor is
+        # too - step through those, bounded so the cofactor fits
+        first = max(low, -(-num // high))
+        for i in range(high - high % 11, first - 1, -11):
+            if num % i == 0 and low <= num // i <= high:
+                return max(i, num // i), min(i, num // i)
+        return None
+    i = high
+    while i * i >= num:
+        if num % i == 0 and num // i >= low:
+            return i, num // i
+        i -= 1
+    return None
+
 
-def get_factors(num):
-    """yields a tuple of all factors."""
-    factors = []
-    for i in range(int(num**0.5)+1, 1, -1):
-        if num % i == 0:
-            factors.append((i, num/i))
-    return factors
+def palindrome_chunks(digits, size=CHUNK_HALVES):
+    """yields (length, first half, count) chunks covering the candidates
+        of find_palindrome in the order it tries them."""
+    for length in (2 * digits, 2 * digits - 1):
+        half = (length + 1) // 2
+        lowest = 10**(half - 1)
+        for first in range(10**half - 1, lowest - 1, -size):
+            yield length, first, min(size, first - lowest + 1)
+
+
+def _init_worker(best_chunk):
+    """Keeps the shared bound in the pool worker."""
+    global _best_chunk
+    _best_chunk = best_chunk
+
+
+def _scan_chunk(index, digits, length, first, count):
+    """Checks one chunk of palindromes, largest first. Gives up as soon
+        as an earlier chunk is known to hold a hit."""
+    top = (10**digits - 1)**2
+    odd = length % 2
+    for i in range(first, first - count, -1):
+        if _best_chunk.value < index:
+            return None
+        head = str(i)
+        suspect = int(head + head[::-1][odd:])
+        if suspect > top:
+            continue
+        factors = get_factors(suspect, digits)
+        if factors:
+            with _best_chunk.get_lock():
+                _best_chunk.value = min(_best_chunk.value, index)
+            return suspect, factors
+    return None
+
+
+def find_palindrome_parallel(digits=3, workers=None, size=CHUNK_HALVES):
+    """find_palindrome with the descending candidates split into chunks
+        checked across a process pool. Chunks are submitted in order and
+        a shared bound cancels the ones that can no longer win, so the
+        answer is the serial one."""
+    workers = workers or os.cpu_count()
+    best_chunk = multiprocessing.Value('q', _NO_HIT)
+    chunks = enumerate(palindrome_chunks(digits, size))
+    results, running = {}, {}
+    done = 0    # every chunk below this index has been checked
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(best_chunk,)) as pool:
+        while True:
+            # chunks go out in order, so nothing past a hit is needed
+            while len(running) < 2 * workers and best_chunk.value == _NO_HIT:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                index, args = chunk
+                future = pool.submit(_scan_chunk, index, digits, *args)
+                running[future] = index
+            if not running:
+                return None
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                results[running.pop(future)] = future.result()
+            while done in results:
+                hit = results.pop(done)
+                if hit:
+                    for future in running:
+                        future.cancel()
+                    return hit
+                done += 1
 
 
 def find_palindrome(digits=3):
     """returns the largest palindrome and its factors where
         each factor is a given number of digits."""
-    top_str = str((10**digits - 1)**2)
+    top = (10**digits - 1)**2
+    for length in (2 * digits, 2 * digits - 1):
+        for suspect in palindromes(length):
+            if suspect > top:
+                continue
+            factors = get_factors(suspect, digits)
+            if factors:
+                return suspect, factors
+    return None
 
-    chars = int(math.ceil(len(top_str)/2.0))
-    is_odd_len = len(top_str) % 2
 
-    for i in range(int(top_str[0:chars]), 10**(chars-1), -1):
-        suspect = str(i) + str(i)[::-1][is_odd_len:]
+def benchmark(max_digits=9):
+    """prints how long find_palindrome takes for each digit count."""
+    print("{:>2} {:>20} {:>23} {:>9}".format('d', 'palindrome', 'factors',
+                                            'seconds'))
+    for digits in range(1, max_digits + 1):
+        start = time.time()
+        suspect, factors = find_palindrome(digits)
+        print("{:>2} {:>20} {:>23} {:>9.3f}".format(
+            digits, suspect, "{} x {}".format(*factors),
+            time.time() - start))
 
-        for factors in get_factors(int(suspect)):
-            if all(len(str(f)) == digits for f in factors):
-                return suspect, factors
 
 if __name__ == '__main__':
     print(find_palindrome(3))
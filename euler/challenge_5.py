@@ -7,21 +7,72 @@ What is the smallest positive number that is evenly divisible by all
 of the numbers from 1 to 20?
 """
 
+from array import array
 from collections import defaultdict
 import operator
 from functools import reduce
+from math import isqrt
 
-def find_primes_counts(number):
-    """Returns a dictionary consisting of prime:count"""
+from challenge_10 import small_primes
+
+
+def spf_table(limit):
+    """Returns an array holding the smallest prime factor of each of
+        0..limit (0 and 1 map to themselves). Primes are sieved largest
+        first so smaller primes overwrite their shared multiples."""
+    spf = array('I', range(limit + 1))
+    for p in reversed(small_primes(isqrt(limit) + 1)):
+        multiples = len(range(p * p, limit + 1, p))
+        spf[p * p::p] = array('I', [p]) * multiples
+    return spf
+
+def factorize(number, spf):
+    """Returns a dictionary consisting of prime:count, walking the
+        smallest prime factor table - O(log number)."""
     counts = defaultdict(int)
-    i = 2
     while number > 1:
-        while number % i == 0:
-            number = number / i
-            counts[i] += 1
-        i += 1
+        p = spf[number]
+        number //= p
+        counts[p] += 1
     return counts
 
+def totient(number, spf):
+    """Returns Euler's totient of number using the factor table."""
+    result = number
+    for p in factorize(number, spf):
+        result = result // p * (p - 1)
+    return result
+
+def product(nums):
+    """Multiplies nums pairwise so big operands stay balanced."""
+    nums = list(nums)
+    if not nums:
+        return 1
+    while len(nums) > 1:
+        paired = [a * b for a, b in zip(nums[::2], nums[1::2])]
+        if len(nums) % 2:
+            paired.append(nums[-1])
+        nums = paired
+    return nums[0]
+
+def lcm_range(start, end):
+    """Returns the least common multiple of start..end. Once start is at
+        most end//2 + 1 every smaller number divides something in range, so
+        the answer is just the largest power of each prime up to end."""
+    if start <= end // 2 + 1:
+        powers = []
+        for p in small_primes(end + 1):
+            power = p
+            while power * p <= end:
+                power *= p
+            powers.append(power)
+        return product(powers)
+    spf = spf_table(end)
+    counts = reduce(reduce_counts, (factorize(i, spf)
+                                    for i in range(start, end + 1)),
+                    defaultdict(int))
+    return product(operator.pow(*i) for i in counts.items())
+
 def reduce_counts(left, right):
     """Modifies count a by adding elements from b if greater"""
     for k in right:
@@ -29,15 +80,10 @@ def reduce_counts(left, right):
             left[k] = right[k]
     return left
 
-def multiply_count(cnt):
-    """converts a prime count to the smallest multiple"""
-    return reduce(operator.mul, [operator.pow(*i) for i in cnt.items()])
-
 def find_min_multiple(num=20):
     """Returns the smallest number that is a multiple of all integers up
         to the given number."""
-    prime_counts = [find_primes_counts(i) for i in range(num+1)]
-    return multiply_count(reduce(reduce_counts, prime_counts))
+    return lcm_range(1, num)
 
 
 if __name__ == '__main__':
@@ -13,11 +13,96 @@ Find the difference between the sum of the squares of the first one
 hundred natural numbers and the square of the sum.
 """
 
+from fractions import Fraction
+from functools import lru_cache
+from math import comb, lcm
+from numbers import Integral
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Bernoulli numbers B0, B1, ... (B1 = +1/2), extended on demand.
+_BERNOULLI = [Fraction(1)]
+
+
+def bernoulli(m):
+    """Returns the mth Bernoulli number, with B1 = +1/2."""
+    while len(_BERNOULLI) <= m:
+        k = len(_BERNOULLI)
+        # with B1 = +1/2, sum(C(k+1, j) * Bj for j <= k) == k + 1
+        total = sum(comb(k + 1, j) * b for j, b in enumerate(_BERNOULLI))
+        _BERNOULLI.append((k + 1 - total) / (k + 1))
+    return _BERNOULLI[m]
+
+
+@lru_cache(maxsize=None)
+def faulhaber(power):
+    """Returns (coefficients, denominator) such that sum(i**power for i in
+        1..n) == sum(c * n**j for j, c in enumerate(coefficients)) //
+        denominator, using Faulhaber's formula with exact integers."""
+    terms = [Fraction(0)] * (power + 2)
+    for j in range(power + 1):
+        terms[power + 1 - j] = comb(power + 1, j) * bernoulli(j) / (power + 1)
+    denominator = lcm(*(t.denominator for t in terms))
+    return tuple(int(t * denominator) for t in terms), denominator
+
+
+def power_sum(num, power=1):
+    """sum(i**power for i in 1..num) in O(power) exact integer steps."""
+    coefficients, denominator = faulhaber(power)
+    total = 0
+    for c in reversed(coefficients):
+        total = total * num + c
+    return total // denominator
+
+
+def power_sums(nums, power=1):
+    """power_sum for every n in nums, returned as a list in one call. The
+        power may be any integer or a sequence of them, paired with nums.
+        With NumPy, nums are grouped by power and each group is one
+        vectorised Horner pass when its values fit in int64."""
+    if isinstance(power, Integral):
+        power = [power] * len(nums)
+    if numpy is None or not len(nums):
+        return [power_sum(int(n), int(p)) for n, p in zip(nums, power)]
+    ns = numpy.asarray(nums)
+    powers, inverse, counts = numpy.unique(
+        numpy.asarray(power), return_inverse=True, return_counts=True)
+    order = numpy.argsort(inverse, kind='stable')
+    results = numpy.empty(len(ns), dtype=object)
+    end = 0
+    for p, size in zip(powers.tolist(), counts.tolist()):
+        indexes = order[end:end + size]
+        end += size
+        coefficients, denominator = faulhaber(p)
+        group = ns[indexes]
+        if group.dtype.kind in 'iu':
+            peak = max(abs(int(group.min())), abs(int(group.max())), 1)
+            bound = sum(abs(c) for c in coefficients) * peak ** (p + 1)
+        else:
+            bound = 2**63
+        if bound < 2**63:
+            group = group.astype(numpy.int64)
+            total = numpy.zeros(len(group), dtype=numpy.int64)
+            for c in reversed(coefficients):
+                total = total * group + c
+            results[indexes] = (total // denominator).tolist()
+        else:
+            results[indexes] = [power_sum(int(n), p) for n in group.tolist()]
+    return results.tolist()
+
+
 def squaresum_sumsquare_diff(num=10):
     """sum(1..n)**2 - sum(1..n**2)"""
-    squaresum = ((num+1)*(num/2))**2
-    sumsquare = sum(i**2 for i in range(num+1))
-    return squaresum-sumsquare
+    return power_sum(num, 1)**2 - power_sum(num, 2)
+
+
+def squaresum_sumsquare_diffs(nums):
+    """squaresum_sumsquare_diff for every n in nums."""
+    sums = power_sums(nums, 1)
+    return [s * s - sq for s, sq in zip(sums, power_sums(nums, 2))]
 
 
 if __name__ == '__main__':
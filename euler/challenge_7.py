@@ -5,16 +5,64 @@ By listing the first six prime numbers: 2, 3, 5, 7, 11, and 13, we can see that
 What is the 10 001st prime number?
 
 """
+from collections import deque
+from itertools import compress, islice
+from math import isqrt, log
 
-def find_nth_prime(nth=6):
+from challenge_10 import (gen_segments, parallel_segments, sieve_segment,
+                          small_primes)
+
+
+def nth_prime_upper_bound(nth):
+    """Returns an upper bound for the nth prime - Rosser's bound, tightened
+        with Dusart's for large n."""
+    if nth < 6:
+        return 11
+    ln_n = log(nth)
+    ln_ln_n = log(ln_n)
+    if nth >= 688383:
+        return int(nth * (ln_n + ln_ln_n - 1 + (ln_ln_n - 2) / ln_n)) + 1
+    return int(nth * (ln_n + ln_ln_n)) + 1
+
+
+def _runs(limit, workers):
+    """Yields (low, high, count, segment) for consecutive runs of the odd
+        numbers below limit. Parallel runs are counted in the pool and come
+        back without a segment."""
+    if workers is None:
+        for low, segment in gen_segments(limit):
+            yield low, low + 2 * len(segment), segment.count(1), segment
+    else:
+        for low, high, count in parallel_segments(limit, 'count', workers):
+            yield low, high, count, None
+
+
+def find_nth_primes(nths, workers=None):
+    """Returns the nth prime for each n in nths, from a single sieve pass
+        up to the bound of the largest n."""
+    assert all(nth > 0 for nth in nths), "Primes are counted from 1."
+    found = {1: 2}
+    pending = deque(nth for nth in sorted(set(nths)) if nth > 1)
+    if pending:
+        limit = nth_prime_upper_bound(pending[-1]) + 1
+        count = 1
+        for low, high, run_count, segment in _runs(limit, workers):
+            while pending and pending[0] <= count + run_count:
+                if segment is None:
+                    base_primes = small_primes(isqrt(high) + 1)[1:]
+                    segment = sieve_segment(low, high, base_primes)
+                primes = compress(range(low, high, 2), segment)
+                nth = pending.popleft()
+                found[nth] = next(islice(primes, nth - count - 1, None))
+            if not pending:
+                break
+            count += run_count
+    return [found[nth] for nth in nths]
+
+
+def find_nth_prime(nth=6, workers=None):
     """find the nth prime"""
-    primes = [2, 3]
-    i = 3
-    while len(primes) < nth:
-        i += 2
-        if all(i % p > 0 for p in primes):
-            primes.append(i)
-    return i
+    return find_nth_primes([nth], workers)[0]
 
 
 if __name__ == '__main__':
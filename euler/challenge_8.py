@@ -30,6 +30,34 @@ the greatest product. What is the value of this product?
 """
 import operator
 from functools import reduce
+import os
+import re
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Digits handed to the NumPy kernel at a time (its work arrays are a few
+# dozen bytes per digit).
+CHUNK_DIGITS = 2**20
+
+# Bytes read from a digit file at a time.
+READ_SIZE = 2**20
+
+# Maps ASCII digits to their values.
+_DIGIT_VALUES = bytes.maketrans(b'0123456789', bytes(range(10)))
+
+# Every non-zero digit is 2^a 3^b 5^c 7^d, so a window product is exactly
+# described by the summed exponents of its digits.
+_FACTORS = (2, 3, 5, 7)
+_EXPONENTS = ((0, 0, 0, 0), (0, 0, 0, 0), (1, 0, 0, 0), (0, 1, 0, 0),
+              (2, 0, 0, 0), (0, 0, 1, 0), (1, 1, 0, 0), (0, 0, 0, 1),
+              (3, 0, 0, 0), (0, 2, 0, 0))
+
+if numpy is not None:
+    _DIGIT_LOGS = numpy.log(numpy.maximum(numpy.arange(10), 1))
+    _DIGIT_EXPONENTS = numpy.array(_EXPONENTS, numpy.int32)
 
 
 numbers = """73167176531330624919225119674426574742355349194934
@@ -53,16 +81,124 @@ numbers = """73167176531330624919225119674426574742355349194934
 05886116467109405077541002256983155200055935729725
 71636269561882670428252483600823257530420752963450"""
 
+def _runs_product(digits, num_digits):
+    """Pure Python engine: keeps a rolling product through each zero-free
+        run, dividing out the digit that leaves the window."""
+    best = 0, 0
+    pattern = b'[1-9]{%d,}' % num_digits
+    for match in re.finditer(pattern, digits):
+        run = match.group().translate(_DIGIT_VALUES)
+        prod = reduce(operator.mul, run[:num_digits])
+        if prod > best[0]:
+            best = prod, match.start()
+        for i in range(num_digits, len(run)):
+            prod = prod * run[i] // run[i - num_digits]
+            if prod > best[0]:
+                best = prod, match.start() + i - num_digits + 1
+    return best
+
+
+def _chunk_product(digits, num_digits):
+    """NumPy engine: rolling log-sums rank every window, then the windows
+        within rounding distance of the best are settled exactly from their
+        summed prime exponents."""
+    values = numpy.frombuffer(digits, numpy.uint8) - ord('0')
+    zeros = numpy.zeros(len(values) + 1, numpy.int32)
+    numpy.cumsum(values == 0, out=zeros[1:])
+    logs = numpy.zeros(len(values) + 1)
+    numpy.cumsum(_DIGIT_LOGS[values], out=logs[1:])
+    scores = logs[num_digits:] - logs[:-num_digits]
+    scores[zeros[num_digits:] != zeros[:-num_digits]] = -1
+    top = scores.max()
+    if top < 0:
+        return 0, 0
+    near = numpy.flatnonzero(scores >= top - 1e-6)
+    if len(near) == 1:
+        offset = int(near[0])
+        window = digits[offset:offset + num_digits].translate(_DIGIT_VALUES)
+        return reduce(operator.mul, window), offset
+    exponents = numpy.zeros((len(values) + 1, 4), numpy.int32)
+    numpy.cumsum(_DIGIT_EXPONENTS[values], axis=0, out=exponents[1:])
+    rows = exponents[near + num_digits] - exponents[near]
+    best = 0, 0
+    while len(near):
+        # equal rows are equal products, so settle one distinct row a pass
+        prod = _exact_product(rows[0].tolist())
+        if prod > best[0]:
+            best = prod, int(near[0])
+        other = (rows != rows[0]).any(axis=1)
+        rows, near = rows[other], near[other]
+    return best
+
+
+def _exact_product(exponents):
+    """Converts a row of 2, 3, 5, 7 exponents back into an integer."""
+    return reduce(operator.mul, map(pow, _FACTORS, exponents))
+
+
+def greatest_window_product(digits, num_digits=4):
+    """Returns (product, offset) of the leftmost window of num_digits
+        adjacent digits with the greatest product. digits is a str or a
+        bytes-like object (bytes, mmap) holding only ASCII digits.
+        Runs in O(n), vectorised when NumPy is available."""
+    assert num_digits > 0, "Windows need at least one digit."
+    if isinstance(digits, str):
+        digits = digits.encode()
+    if len(digits) < num_digits:
+        return 0, None
+    if numpy is None:
+        return _runs_product(digits, num_digits)
+    best = 0, None
+    for start in range(0, len(digits) - num_digits + 1, CHUNK_DIGITS):
+        chunk = digits[start:start + CHUNK_DIGITS + num_digits - 1]
+        prod, offset = _chunk_product(chunk, num_digits)
+        if best[1] is None or prod > best[0]:
+            best = prod, start + offset
+    return best
+
+
+def iter_digit_chunks(source, num_digits, read_size=READ_SIZE):
+    """Yields (offset, digits) from a path or binary file object, reading
+        read_size bytes at a time and dropping whitespace chunk by chunk.
+        Each chunk starts with the last num_digits-1 digits of the one
+        before, so every window lies wholly inside some chunk; offset
+        counts digits from the start of the input."""
+    opened = isinstance(source, (str, bytes, os.PathLike))
+    handle = open(source, 'rb') if opened else source
+    try:
+        offset = 0
+        digits = b''
+        for block in iter(lambda: handle.read(read_size), b''):
+            digits += block.translate(None, b' \t\n\r\v\f')
+            if len(digits) < num_digits:
+                continue
+            yield offset, digits
+            overlap = len(digits) - num_digits + 1
+            offset += overlap
+            digits = digits[overlap:]
+    finally:
+        if opened:
+            handle.close()
+
+
+def greatest_product_in_file(source, num_digits=4, read_size=READ_SIZE):
+    """greatest_window_product over a digit file of any size, streamed in
+        constant memory. The offset skips whitespace."""
+    best = 0, None
+    for start, digits in iter_digit_chunks(source, num_digits, read_size):
+        prod, offset = greatest_window_product(digits, num_digits)
+        if best[1] is None or prod > best[0]:
+            best = prod, start + offset
+    return best
+
+
 def find_greatest_product(num_digits=4):
     """find the greatest product with n adjacent digits"""
     digits = "".join(numbers.split())
-    best = 0, []
-    for i in range(len(digits)-num_digits):
-        factors = [int(c) for c in digits[i:i+num_digits]]
-        prod = reduce(operator.mul, factors)
-        if prod > best[0]:
-            best = prod, factors
-    return best
+    prod, offset = greatest_window_product(digits, num_digits)
+    if offset is None:
+        return 0, []
+    return prod, [int(c) for c in digits[offset:offset + num_digits]]
 
 
 if __name__ == '__main__':
@@ -9,19 +9,128 @@ There exists exactly one Pythagorean triplet for which a + b + c = 1000.
 Find the product abc.
 
 """
+from array import array
 import operator
 from functools import reduce
+from math import gcd, isqrt
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def primitive_triples(max_perimeter):
+    """Yields every primitive triple (a, b, c), a < b, with a perimeter
+        up to max_perimeter. Uses Euclid's formula: for coprime m > n of
+        opposite parity, (m*m - n*n, 2*m*n, m*m + n*n) has perimeter
+        2*m*(m + n)."""
+    m = 2
+    while 2 * m * (m + 1) <= max_perimeter:
+        for n in range(1 + m % 2, m, 2):
+            if 2 * m * (m + n) > max_perimeter:
+                break
+            if gcd(m, n) == 1:
+                a, b = m * m - n * n, 2 * m * n
+                yield min(a, b), max(a, b), m * m + n * n
+        m += 1
+
+
+def triples_up_to(max_perimeter):
+    """Yields every triple, primitive or scaled, with a perimeter up to
+        max_perimeter."""
+    for a, b, c in primitive_triples(max_perimeter):
+        for k in range(1, max_perimeter // (a + b + c) + 1):
+            yield k * a, k * b, k * c
+
+
+def triples_with_perimeter(total):
+    """Returns every triple (a, b, c), a < b, with a + b + c == total,
+        sorted by a. A primitive triple from (m, n) fits when 2*m*(m + n)
+        divides total, so only divisors m of total/2 are tried."""
+    triples = []
+    if total % 2:
+        return triples
+    half = total // 2
+    for m in range(2, isqrt(half) + 1):
+        if half % m:
+            continue
+        rest = half // m
+        # s = m + n, odd and coprime to m
+        for s in range(m + 1 + m % 2, min(2 * m, rest + 1), 2):
+            if rest % s == 0 and gcd(m, s) == 1:
+                k = rest // s
+                n = s - m
+                a, b = m * m - n * n, 2 * m * n
+                triples.append((k * min(a, b), k * max(a, b),
+                                k * (m * m + n * n)))
+    return sorted(triples)
+
+
+def berggren_perimeters(max_perimeter):
+    """Yields the perimeter of every primitive triple up to max_perimeter
+        by walking the Berggren tree from (3, 4, 5); children always have
+        larger perimeters, so branches are cut at the bound."""
+    stack = [(3, 4, 5)]
+    while stack:
+        a, b, c = stack.pop()
+        if a + b + c > max_perimeter:
+            continue
+        yield a + b + c
+        stack.append((a - 2*b + 2*c, 2*a - b + 2*c, 2*a - 2*b + 3*c))
+        stack.append((a + 2*b + 2*c, 2*a + b + 2*c, 2*a + 2*b + 3*c))
+        stack.append((-a + 2*b + 2*c, -2*a + b + 2*c, -2*a + 2*b + 3*c))
+
+
+class TripleCounts(object):
+    '''Number of right triangles with integer sides for every perimeter
+    up to a limit, built once from the primitive triple tree.'''
+    def __init__(self, limit):
+        '''Constructor! Adds each primitive perimeter to its multiples and
+        precomputes the running argmax.'''
+        self.limit = limit
+        if numpy is None:
+            self.counts = array('I', bytes(4 * (limit + 1)))
+            for p in berggren_perimeters(limit):
+                for q in range(p, limit + 1, p):
+                    self.counts[q] += 1
+            self.best = array('I', bytes(4 * (limit + 1)))
+            top = 0
+            for p, count in enumerate(self.counts):
+                if count > self.counts[top]:
+                    top = p
+                self.best[p] = top
+        else:
+            self.counts = numpy.zeros(limit + 1, numpy.uint32)
+            for p in berggren_perimeters(limit):
+                self.counts[p::p] += 1
+            peaks = numpy.maximum.accumulate(self.counts)
+            rises = numpy.ones(limit + 1, bool)
+            rises[1:] = self.counts[1:] > peaks[:-1]
+            self.best = numpy.maximum.accumulate(
+                numpy.where(rises, numpy.arange(limit + 1), 0))
+
+    def count(self, perimeter):
+        '''Number of triples with the given perimeter.'''
+        return int(self.counts[perimeter])
+
+    def argmax(self, limit=None):
+        '''Smallest perimeter up to limit with the most triples.'''
+        return int(self.best[self.limit if limit is None else limit])
+
+    def with_count(self, count, limit=None):
+        '''All perimeters up to limit with exactly count triples.'''
+        limit = self.limit if limit is None else limit
+        if numpy is None:
+            return [p for p in range(limit + 1) if self.counts[p] == count]
+        return numpy.flatnonzero(self.counts[:limit + 1] == count).tolist()
 
 
 def find_pythagorean_wholes(total=1000):
     """returns the pythagorean set where the sum is the
         given total."""
-    leg_max = total/2
-    for i in range(1, leg_max):
-        for j in range(1, leg_max):
-            hyp = (i**2+j**2)**0.5
-            if hyp.is_integer() and (hyp+i+j) == total:
-                return i, j, hyp
+    triples = triples_with_perimeter(total)
+    return triples[0] if triples else None
 
 if __name__ == '__main__':
     print(reduce(operator.mul, find_pythagorean_wholes(1000)))
@@ -0,0 +1,157 @@
+"""Persistent prime table shared by the prime based challenges.
+
+The table is an odd-only sieve packed one bit per odd number (bit i of the
+file stands for 2*i + 1) followed by a rank index holding the number of odd
+primes before every block of bits. It is written once with build_table and
+then memory-mapped by PrimeTable, so is_prime is a single bit probe and
+pi / nth_prime only look at the index plus one block.
+
+Usage:
+    python prime_table.py primes.bin 1e9
+"""
+from bisect import bisect_left
+from itertools import compress
+import mmap
+import struct
+import sys
+
+from challenge_10 import gen_segments
+
+MAGIC = b'PRIMETBL'
+HEADER = struct.Struct('<8sQQQ')   # magic, limit, bit bytes, index entries
+
+# Bytes of sieve bits per rank index entry (512 odd numbers).
+BLOCK_BYTES = 64
+BLOCK_BITS = BLOCK_BYTES * 8
+
+# Bytes of sieve bits unpacked at a time while iterating.
+CHUNK_BYTES = 2**16
+
+_TO_ASCII = bytes.maketrans(b'\x00\x01', b'01')
+_FROM_ASCII = bytes.maketrans(b'01', b'\x00\x01')
+
+
+def pack_bits(flags):
+    """Packs a bytearray of 0/1 flags (length a multiple of 8) into bits,
+        least significant bit first."""
+    return int(flags.translate(_TO_ASCII)[::-1], 2).to_bytes(
+        len(flags) // 8, 'little')
+
+
+def unpack_bits(bits):
+    """Inverse of pack_bits - returns one 0/1 byte per bit."""
+    flags = bin(int.from_bytes(bits, 'little'))[2:].zfill(len(bits) * 8)
+    return flags[::-1].encode().translate(_FROM_ASCII)
+
+
+def build_table(path, limit):
+    """Sieves the primes below limit and writes them as a table to path."""
+    limit = int(limit)
+    index = [0]
+    with open(path, 'wb') as handle:
+        handle.write(HEADER.pack(MAGIC, limit, 0, 0))
+        bit_bytes = 0
+        for _, segment in gen_segments(limit):
+            segment.extend(bytes(-len(segment) % BLOCK_BITS))
+            for start in range(0, len(segment), BLOCK_BITS):
+                index.append(
+                    index[-1] + segment.count(1, start, start + BLOCK_BITS))
+            bits = pack_bits(segment)
+            handle.write(bits)
+            bit_bytes += len(bits)
+        handle.write(struct.pack('<{}Q'.format(len(index)), *index))
+        handle.seek(0)
+        handle.write(HEADER.pack(MAGIC, limit, bit_bytes, len(index)))
+
+
+class PrimeTable(object):
+    '''Read-only, memory-mapped view of a table written by build_table.'''
+    def __init__(self, path):
+        '''Constructor! Maps the file, nothing is read up front.'''
+        with open(path, 'rb') as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.limit, bit_bytes, entries = HEADER.unpack_from(self._map)
+        assert magic == MAGIC, "Not a prime table."
+        view = memoryview(self._map)
+        self._bits = view[HEADER.size:HEADER.size + bit_bytes]
+        start = HEADER.size + bit_bytes
+        self._index = view[start:start + 8 * entries].cast('Q')
+
+    def close(self):
+        '''Unmaps the file.'''
+        self._index.release()
+        self._bits.release()
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.pi(self.limit - 1)
+
+    def __iter__(self):
+        return self.primes()
+
+    def _check(self, num):
+        assert num < self.limit, "{} is beyond the table limit {}.".format(
+            num, self.limit)
+
+    def is_prime(self, num):
+        '''Returns whether num is prime.'''
+        self._check(num)
+        if num < 3 or num % 2 == 0:
+            return num == 2
+        i = num // 2
+        return bool(self._bits[i >> 3] >> (i & 7) & 1)
+
+    def pi(self, num):
+        '''Returns the number of primes less than or equal to num.'''
+        num = min(num, self.limit - 1)
+        if num < 2:
+            return 0
+        i = (num - 1) // 2      # bit of the largest odd number <= num
+        block = i // BLOCK_BITS
+        first = block * BLOCK_BYTES
+        word = int.from_bytes(self._bits[first:i // 8 + 1], 'little')
+        word &= (1 << (i - block * BLOCK_BITS + 1)) - 1
+        return 1 + self._index[block] + bin(word).count('1')
+
+    def nth_prime(self, nth):
+        '''Returns the nth prime, counting 2 as the first.'''
+        assert nth > 0, "Primes are counted from 1."
+        if nth == 1:
+            return 2
+        assert nth <= len(self), "Table holds fewer than {} primes.".format(
+            nth)
+        rank = nth - 1          # odd primes up to and including the answer
+        block = bisect_left(self._index, rank) - 1
+        first = block * BLOCK_BYTES
+        word = int.from_bytes(self._bits[first:first + BLOCK_BYTES], 'little')
+        for _ in range(rank - self._index[block] - 1):
+            word &= word - 1
+        bit = (word & -word).bit_length() - 1
+        return 2 * (block * BLOCK_BITS + bit) + 1
+
+    def primes(self, start=0, stop=None):
+        '''Generates the primes in [start, stop) in order.'''
+        stop = self.limit if stop is None else min(stop, self.limit)
+        if start <= 2 < stop:
+            yield 2
+        first = max(start, 1) // 16         # byte holding the first odd
+        last = (stop - 1) // 16 + 1
+        for pos in range(first, last, CHUNK_BYTES):
+            flags = unpack_bits(self._bits[pos:min(pos + CHUNK_BYTES, last)])
+            low = 16 * pos + 1
+            nums = range(low, low + 2 * len(flags), 2)
+            for num in compress(nums, flags):
+                if num >= stop:
+                    return
+                if num >= start:
+                    yield num
+
+
+if __name__ == '__main__':
+    build_table(sys.argv[1], float(sys.argv[2]))
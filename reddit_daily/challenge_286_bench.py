@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks for the Rush Hour solver in challenge_286_hard.py
+
+Builds a corpus of random puzzles from a seed (or reads one back from a
+puzzle file), runs every strategy over it and writes one JSON line per run,
+followed by one summary line per strategy:
+
+    python challenge_286_bench.py --width 6 --height 6 --pieces 12 \\
+        --depth 20 --count 10 --seed 1 --strategies bfs,astar,external \\
+        --save-corpus corpus.txt > results.jsonl
+    python challenge_286_bench.py --corpus corpus.txt --strategies bfs
+
+Generated puzzles are the hardest layout reachable from a random placement
+of the pieces, kept if their shortest solution has at least --depth moves.
+The same seed and sizes always give the same corpus.
+
+Each run happens in a fresh process, so peak_rss_kb (ru_maxrss) belongs to
+that search alone; rss_start_kb is the process before the search. A run
+solves the puzzle twice: once as is, for seconds and expanded_per_sec, and
+once with timers around move generation, duplicate detection and frontier
+(queue) operations for the split; whatever else the search does, such as
+heuristics and goal checks, is other. The timers slow that second run
+down, so compare splits with splits only.
+"""
+
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import json
+import random
+import resource
+import string
+import sys
+from time import perf_counter
+
+from challenge_286_hard import Puzzle, SearchLimit, read_puzzles
+
+# Piece labels, R being the escape car.
+LABELS = string.ascii_uppercase.replace('R', '')
+
+# Random placements tried per piece before giving up on it.
+PLACEMENT_TRIES = 100
+
+
+def timer(function, timings, key):
+    '''Wraps function to add the time each call takes to timings[key].'''
+    def timed(*args):
+        start = perf_counter()
+        result = function(*args)
+        timings[key] += perf_counter() - start
+        return result
+    return timed
+
+
+def timed_method(method):
+    '''Wraps a container method to add its running time to the
+    container's timings entry.'''
+    def timed(self, *args):
+        start = perf_counter()
+        result = method(self, *args)
+        self.timings[self.key] += perf_counter() - start
+        return result
+    return timed
+
+
+class Timed(object):
+    '''Mixin for containers that time some of their methods.'''
+    def __init__(self, timings, key, items=()):
+        '''Constructor! Times go to timings[key].'''
+        super().__init__(items)
+        self.timings = timings
+        self.key = key
+
+
+class TimedDict(Timed, dict):
+    __contains__ = timed_method(dict.__contains__)
+    __getitem__ = timed_method(dict.__getitem__)
+    __setitem__ = timed_method(dict.__setitem__)
+    get = timed_method(dict.get)
+
+
+class TimedSet(Timed, set):
+    __contains__ = timed_method(set.__contains__)
+    add = timed_method(set.add)
+    discard = timed_method(set.discard)
+
+
+class TimedDeque(Timed, deque):
+    append = timed_method(deque.append)
+    popleft = timed_method(deque.popleft)
+
+
+class TimedList(Timed, list):
+    append = timed_method(list.append)
+    pop = timed_method(list.pop)
+
+
+class ProfiledPuzzle(Puzzle):
+    '''A Puzzle whose searches (Puzzle's own) time move generation,
+    duplicate detection and frontier operations, by handing them timed
+    containers through the Puzzle.new_* hooks.'''
+    def __init__(self, input):
+        '''Constructor!'''
+        super().__init__(input)
+        self.timings = {'movegen': 0.0, 'dedup': 0.0, 'queue': 0.0}
+
+    def expand(self, state, occupied):
+        '''Times the children of a state into a list.'''
+        start = perf_counter()
+        children = list(super().expand(state, occupied))
+        self.timings['movegen'] += perf_counter() - start
+        return children
+
+    def new_table(self, items=()):
+        return TimedDict(self.timings, 'dedup', items)
+
+    def new_set(self, items=()):
+        return TimedSet(self.timings, 'dedup', items)
+
+    def new_queue(self, items=()):
+        return TimedDeque(self.timings, 'queue', items)
+
+    def new_layer(self, items=()):
+        return TimedList(self.timings, 'queue', items)
+
+    def heap_ops(self):
+        return tuple(timer(op, self.timings, 'queue')
+                     for op in super().heap_ops())
+
+    def read_layer(self, layer):
+        '''Times fetching each code of a layer file.'''
+        codes = iter(super().read_layer(layer))
+        fetch = timer(next, self.timings, 'queue')
+        while True:
+            code = fetch(codes, None)
+            if code is None:
+                return
+            yield code
+
+    def spill_run(self, codes):
+        return timer(super().spill_run, self.timings, 'dedup')(codes)
+
+    def merge_runs(self, runs, layers):
+        return timer(super().merge_runs, self.timings, 'dedup')(runs, layers)
+
+
+def random_layout(rng, width, height, pieces):
+    '''Places R on the goal row and up to pieces - 1 other cars and trucks
+    at random, returning the layout string.'''
+    grid = [['.'] * width for _ in range(height)]
+    goal_row = (height - 1) // 2
+    x = rng.randrange(width - 1)
+    grid[goal_row][x:x + 2] = 'RR'
+    for label in LABELS[:pieces - 1]:
+        for _ in range(PLACEMENT_TRIES):
+            size = rng.choice((2, 2, 3))
+            if rng.random() < 0.5:
+                y, x = rng.randrange(height), rng.randrange(width - size + 1)
+                cells = [(y, x + i) for i in range(size)]
+            else:
+                y, x = rng.randrange(height - size + 1), rng.randrange(width)
+                cells = [(y + i, x) for i in range(size)]
+            if all(grid[y][x] == '.' for y, x in cells):
+                for y, x in cells:
+                    grid[y][x] = label
+                break
+    rows = [''.join(row) for row in grid]
+    rows[goal_row] += '>'
+    return '\n'.join(rows)
+
+
+def hardest_reachable(puzzle, max_states):
+    '''Returns (moves, state) for the layout furthest from the goal among
+    those reachable from the puzzle's start, or None if the goal can't be
+    reached or there are more than max_states of them.'''
+    reachable = {puzzle.start: puzzle.occupancy(puzzle.start)}
+    layer = list(reachable.items())
+    while layer:
+        previous, layer = layer, []
+        for state, occupied in previous:
+            for cs, cs_occupied in puzzle.get_child_states(state, occupied):
+                if cs not in reachable:
+                    reachable[cs] = cs_occupied
+                    layer.append((cs, cs_occupied))
+        if len(reachable) > max_states:
+            return None
+    # slides are reversible, so search back from the winners
+    layer = [(state, occupied) for state, occupied in reachable.items()
+             if puzzle.is_winner(state)]
+    distances = dict.fromkeys((state for state, _ in layer), 0)
+    while layer:
+        previous, layer = layer, []
+        for state, occupied in previous:
+            for cs, cs_occupied in puzzle.get_child_states(state, occupied):
+                if cs not in distances:
+                    distances[cs] = distances[state] + 1
+                    layer.append((cs, cs_occupied))
+    if not distances:
+        return None
+    distance, state = max((d, s) for s, d in distances.items())
+    # the solver always makes at least the one move taking R out
+    return max(distance, 1), state
+
+
+def generate(rng, width, height, pieces, depth, attempts=1000,
+             max_states=200000):
+    '''Returns (layout, moves) for a random solvable puzzle whose shortest
+    solution takes at least depth moves.'''
+    for _ in range(attempts):
+        puzzle = Puzzle(random_layout(rng, width, height, pieces))
+        hardest = hardest_reachable(puzzle, max_states)
+        if hardest is not None and hardest[0] >= depth:
+            return puzzle.render(hardest[1]), hardest[0]
+    assert False, "No {}x{} puzzle of {} moves in {} attempts.".format(
+        width, height, depth, attempts)
+
+
+def generate_corpus(seed, count, width, height, pieces, depth):
+    '''Returns a list of count (layout, moves) puzzles from one seed.'''
+    rng = random.Random(seed)
+    return [generate(rng, width, height, pieces, depth)
+            for _ in range(count)]
+
+
+def max_rss_kb():
+    '''Peak resident set size of this process in KiB (Linux units).'''
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def bench_one(index, layout, strategy, heuristic='blocking', max_states=None,
+              timeout=None):
+    '''Solves one layout with and without timers, returning a dict.'''
+    result = {'puzzle': index, 'strategy': strategy, 'heuristic': heuristic,
+              'status': 'solved', 'depth': None,
+              'rss_start_kb': max_rss_kb()}
+    puzzle = Puzzle(layout)
+    start = perf_counter()
+    try:
+        puzzle.solve(strategy, heuristic, max_states, timeout)
+    except SearchLimit as e:
+        result['status'] = 'limit'
+        result['error'] = str(e)
+    seconds = perf_counter() - start
+    if result['status'] == 'solved':
+        if puzzle.winner is None:
+            result['status'] = 'unsolvable'
+        else:
+            result['depth'] = len(puzzle.moves)
+    result['expanded'] = puzzle.expanded
+    result['seconds'] = round(seconds, 6)
+    result['expanded_per_sec'] = round(puzzle.expanded / seconds) if (
+        seconds) else None
+    result['peak_visited'] = puzzle.visited
+
+    result['split'] = None
+    if result['status'] != 'limit':
+        # the timers make this run slower, so it can hit a limit the
+        # first one didn't - the split is then left out
+        profiled = ProfiledPuzzle(layout)
+        start = perf_counter()
+        try:
+            profiled.solve(strategy, heuristic, max_states, timeout)
+        except SearchLimit as e:
+            result['split_error'] = str(e)
+        else:
+            split = {key: round(value, 6)
+                     for key, value in profiled.timings.items()}
+            total = perf_counter() - start
+            split['other'] = round(total - sum(profiled.timings.values()),
+                                   6)
+            result['split'] = split
+    result['peak_rss_kb'] = max_rss_kb()
+    return result
+
+
+def summarize(results):
+    '''Yields one summary dict per strategy, in the order first seen.'''
+    strategies = {}
+    for result in results:
+        strategies.setdefault(result['strategy'], []).append(result)
+    for strategy, runs in strategies.items():
+        seconds = sum(run['seconds'] for run in runs)
+        expanded = sum(run['expanded'] for run in runs)
+        yield {'summary': strategy, 'runs': len(runs),
+               'solved': sum(run['status'] == 'solved' for run in runs),
+               'seconds': round(seconds, 6), 'expanded': expanded,
+               'expanded_per_sec': round(expanded / seconds) if (
+                   seconds) else None,
+               'peak_rss_kb': max(run['peak_rss_kb'] for run in runs)}
+
+
+def run_benchmark(puzzles, strategies, out=sys.stdout, workers=1,
+                  **options):
+    '''Benchmarks every (puzzle, strategy) pair, each in a new process,
+    writing one JSON line per run and then the summaries.'''
+    results = []
+    with ProcessPoolExecutor(workers, max_tasks_per_child=1) as pool:
+        futures = [(optimal, pool.submit(bench_one, index, layout, strategy,
+                                         **options))
+                   for index, (layout, optimal) in enumerate(puzzles)
+                   for strategy in strategies]
+        for optimal, future in futures:
+            result = future.result()
+            result['optimal'] = optimal
+            results.append(result)
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+    for summary in summarize(results):
+        out.write(json.dumps(summary) + '\n')
+    return results
+
+
+def main(args):
+    '''Command line entry point.'''
+    parser = argparse.ArgumentParser(
+        description='Benchmark Rush Hour strategies to JSON lines.')
+    parser.add_argument('--corpus', help='puzzle file to use instead of '
+                        'generating one')
+    parser.add_argument('--save-corpus', help='write the puzzles used here')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--count', type=int, default=10)
+    parser.add_argument('--width', type=int, default=6)
+    parser.add_argument('--height', type=int, default=6)
+    parser.add_argument('--pieces', type=int, default=12)
+    parser.add_argument('--depth', type=int, default=10,
+                        help='fewest moves a generated puzzle may take')
+    parser.add_argument('--strategies', default='bfs,bidirectional,astar')
+    parser.add_argument('--heuristic', default='blocking')
+    parser.add_argument('--max-states', type=int)
+    parser.add_argument('--timeout', type=float,
+                        help='seconds allowed per run')
+    parser.add_argument('--workers', type=int, default=1)
+    options = parser.parse_args(args)
+
+    if options.corpus:
+        puzzles = [(layout, None) for layout in read_puzzles(options.corpus)]
+    else:
+        puzzles = generate_corpus(options.seed, options.count, options.width,
+                                  options.height, options.pieces,
+                                  options.depth)
+    if options.save_corpus:
+        with open(options.save_corpus, 'w') as handle:
+            handle.write('\n\n'.join(layout for layout, _ in puzzles) + '\n')
+    run_benchmark(puzzles, options.strategies.split(','),
+                  workers=options.workers, heuristic=options.heuristic,
+                  max_states=options.max_states, timeout=options.timeout)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -16,11 +16,21 @@ Ultimately I'm unsure if this is pythonic enough for my taste, but it works
 and is readable. 
 
 Easy UML:
-    A Puzzle has many PuzzleStates.
-    A Puzzle has one winner (PuzzleState)
-    A PuzzleState has many Moves
+    A Puzzle is parsed from one PuzzleState (the starting layout)
+    A Puzzle has many encoded states (ints) and one winner
+    A Puzzle has many Moves (rebuilt from parent pointers)
     A PuzzleState has many PuzzlePieces
     A PuzzlePiece has a single Position
+
+States are packed into a single int: each piece only ever slides along one
+axis, so its fixed row/column, size and direction are stored once on the
+Puzzle and a state is just the offset of every piece along its axis, a few
+bits per piece.
+
+Batch mode solves a file of puzzles (blank line separated) across processes
+and streams one JSON line per puzzle as it finishes:
+
+    python challenge_286_hard.py puzzles.txt --workers 8 --timeout 10
     
 Original Description:
 
@@ -44,11 +54,38 @@ how to move the cars to allow the red escape car to exit the board.
 
 """
 
+import argparse
+from array import array
+from bisect import bisect_left
 from collections import namedtuple, deque
-from copy import deepcopy
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from heapq import heappush, heappop, merge
+from itertools import count
+import json
+import mmap
+import sys
+import tempfile
+import time
 
 Position = namedtuple('Position', 'y x') 
 
+# Bidirectional search falls back to plain BFS beyond this many goal layouts.
+MAX_GOAL_STATES = 100000
+
+# Distance stored for layouts that can never reach the goal.
+UNSOLVABLE = 255
+
+# Entries IDA* remembers (state -> best depth) to prune transpositions.
+IDA_TABLE_SIZE = 1000000
+
+# Codes the external search sorts in memory before spilling a run to disk,
+# and codes read at a time from each file while merging.
+RUN_SIZE = 2**20
+READ_SIZE = 2**14
+
+class SearchLimit(Exception):
+    '''Raised when a search runs past its state or time budget.'''
+
 class Move(object):
     '''A mutable move object for a defined piece.'''
     def __init__(self, piece, scalar):
@@ -59,40 +96,526 @@ class Move(object):
     def __str__(self):
         return "{} {:+}".format(self.piece, self.scalar)
 
+def read_codes(handle, width, size=READ_SIZE):
+    '''Generates the codes in a file of width byte big-endian records,
+    reading size of them at a time.'''
+    handle.seek(0)
+    while True:
+        chunk = handle.read(width * size)
+        if not chunk:
+            return
+        for i in range(0, len(chunk), width):
+            yield int.from_bytes(chunk[i:i + width], 'big')
+
+def write_codes(codes, width):
+    '''Writes ascending codes as width byte big-endian records (which
+    sort like the ints) to an anonymous temp file (under TMPDIR) and
+    returns the open file.'''
+    handle = tempfile.TemporaryFile()
+    chunk = bytearray()
+    for code in codes:
+        chunk += code.to_bytes(width, 'big')
+        if len(chunk) >= RUN_SIZE * width:
+            handle.write(chunk)
+            chunk = bytearray()
+    handle.write(chunk)
+    return handle
+
+def difference(codes, excluded):
+    '''Yields each distinct code not in excluded, both ascending.'''
+    excluded = iter(excluded)
+    skip = next(excluded, None)
+    last = None
+    for code in codes:
+        while skip is not None and skip < code:
+            skip = next(excluded, None)
+        if code != skip and code != last:
+            yield code
+        last = code
+
 class Puzzle(object):
     def __init__(self, input):
-        '''Constructor! Initializes state.'''
-        self.stateset = set()
-        self.states = deque()
+        '''Constructor! Stores the static piece geometry and encodes the
+        starting layout.'''
+        layout = PuzzleState(input)
+        self.width = layout.width
+        self.height = layout.height
+        self.labels = sorted(layout.pieces.keys())
+        pieces = [layout.pieces[k] for k in self.labels]
+        self.is_horiz = [piece.is_horiz for piece in pieces]
+        self.sizes = [piece.size for piece in pieces]
+        # the row (horizontal) or column (vertical) a piece never leaves
+        self.fixed = [piece.pos.y if piece.is_horiz else piece.pos.x
+                      for piece in pieces]
+        # board length along each piece's axis
+        self.lengths = [self.width if piece.is_horiz else self.height
+                        for piece in pieces]
+        # bitboards: board cell (y, x) is bit y * width + x
+        self.cells = [[1 << self.bit(self.cell(i, c))
+                       for c in range(self.lengths[i])]
+                      for i in range(len(pieces))]
+        self.masks = [[sum(cells[offset:offset + size])
+                       for offset in range(len(cells) - size + 1)]
+                      for cells, size in zip(self.cells, self.sizes)]
+        self.bits = max(self.width, self.height).bit_length()
+        self.mask = (1 << self.bits) - 1
+        # bytes per state in search_external's files
+        self.code_bytes = (len(pieces) * self.bits + 7) // 8
+        self.start = self.encode(
+            piece.pos.x if piece.is_horiz else piece.pos.y
+            for piece in pieces)
+
+        # the offset along its axis at which R touches the goal
+        red = self.labels.index('R')
+        self.red = red
+        goal = self.goal_pos = Position(*layout.goal)
+        if self.is_horiz[red] and goal.y == self.fixed[red]:
+            self.goal = goal.x - self.sizes[red]
+        elif not self.is_horiz[red] and goal.x == self.fixed[red]:
+            self.goal = goal.y - self.sizes[red]
+        else:
+            self.goal = None
+
+        self.parents = dict()
         self.winner = None
-        
-        self.states.append(PuzzleState(input))
-        self.stateset.add(str(self.states[0]))
-        
-    def solve(self):
-        '''Solve the puzzle, saving the winning state into self.winner (if 
-        applicable).'''
-        while self.states:
-            state = self.states.popleft()
-            if state.pieces['R'].get_new_pos(1) == state.goal:
-                # required as we just get R to the edge, not the exit
-                state.moves[-1].scalar += 1
-                self.winner = state
-                return
-            child_states = state.get_child_states()
-            for cs in child_states:
-                id = str(cs)
-                if id not in self.stateset:
-                    self.stateset.add(id)
-                    self.states.append(cs)
+        self.moves = list()
+        self.expanded = 0
+        self.visited = 0
+        self.max_states = None
+        self.deadline = None
+
+    def encode(self, offsets):
+        '''Packs piece offsets into a single int.'''
+        state = 0
+        for i, offset in enumerate(offsets):
+            state |= offset << (i * self.bits)
+        return state
+
+    def decode(self, state):
+        '''Unpacks a state into a list of piece offsets.'''
+        return [(state >> (i * self.bits)) & self.mask
+                for i in range(len(self.labels))]
+
+    def cell(self, i, offset):
+        '''The board position of piece i's cell at an offset along its
+        axis.'''
+        if self.is_horiz[i]:
+            return Position(self.fixed[i], offset)
+        return Position(offset, self.fixed[i])
+
+    def bit(self, pos):
+        '''The bitboard bit index of a board position.'''
+        return pos.y * self.width + pos.x
+
+    def occupancy(self, state):
+        '''The bitboard of cells covered by any piece in a state.'''
+        occupied = 0
+        for i, offset in enumerate(self.decode(state)):
+            occupied |= self.masks[i][offset]
+        return occupied
+
+    def is_winner(self, state):
+        '''Is R against the goal in this state?'''
+        return (state >> (self.red * self.bits)) & self.mask == self.goal
+
+    def get_child_states(self, state, occupied=None):
+        '''Yields (state, occupancy) for every state one slide (of any
+        distance) away. A slide continues while the next cell's bit is
+        clear, and each child's bitboard is patched from its parent's.'''
+        if occupied is None:
+            occupied = self.occupancy(state)
+        for i, offset in enumerate(self.decode(state)):
+            cells, masks = self.cells[i], self.masks[i]
+            shift = i * self.bits
+            # the board without this piece
+            rest = occupied ^ masks[offset]
+            lead = offset - 1
+            while lead >= 0 and not occupied & cells[lead]:
+                yield state - ((offset - lead) << shift), rest | masks[lead]
+                lead -= 1
+            lead = offset + self.sizes[i]
+            while lead < len(cells) and not occupied & cells[lead]:
+                new = lead - self.sizes[i] + 1
+                yield state + ((new - offset) << shift), rest | masks[new]
+                lead += 1
+
+    def solve(self, strategy='bfs', heuristic='blocking', max_states=None,
+              timeout=None):
+        '''Solve the puzzle with a search strategy - 'bfs', 'bidirectional',
+        'astar', 'idastar' or 'external' - saving the winning state into
+        self.winner (if applicable) and its moves into self.moves. The
+        informed strategies use the named heuristic, 'blockers' or
+        'blocking'. All of them find the fewest moves. 'idastar' runs many
+        times slower than the rest and is only for boards whose states
+        won't fit in memory. Raises SearchLimit after expanding max_states
+        states or running for timeout seconds.
+        self.visited tracks the most states the search has held at once, as
+        it goes, so it is meaningful after a SearchLimit too.'''
+        self.expanded = 0
+        self.visited = 0
+        self.max_states = max_states
+        self.deadline = None if timeout is None else time.time() + timeout
+        search = getattr(self, 'search_' + strategy, None)
+        assert search is not None, "Unknown strategy {}.".format(strategy)
+        self.heuristic = getattr(self, heuristic + '_heuristic', None)
+        assert self.heuristic is not None, "Unknown heuristic {}.".format(
+            heuristic)
+        search()
+
+    def expand(self, state, occupied):
+        '''get_child_states for the searches, counted against the
+        limits.'''
+        self.expanded += 1
+        if self.max_states is not None and self.expanded > self.max_states:
+            raise SearchLimit("Expanded more than {} states.".format(
+                self.max_states))
+        if self.deadline is not None and time.time() > self.deadline:
+            raise SearchLimit("Ran out of time.")
+        return self.get_child_states(state, occupied)
+
+    # The searches get their containers and external sort steps from the
+    # methods below, once per search (or per layer), so a subclass can
+    # swap in instrumented ones without any cost to the plain solver.
+    def new_table(self, items=()):
+        '''A state keyed dict, used for duplicate detection.'''
+        return dict(items)
+
+    def new_set(self, items=()):
+        '''A set of states, used for duplicate detection.'''
+        return set(items)
+
+    def new_queue(self, items=()):
+        '''A first in, first out frontier.'''
+        return deque(items)
+
+    def new_layer(self, items=()):
+        '''A list frontier states are gathered in.'''
+        return list(items)
+
+    def heap_ops(self):
+        '''(push, pop) for a heap frontier.'''
+        return heappush, heappop
+
+    def read_layer(self, layer):
+        '''Generates the codes in one of search_external's layer files.'''
+        return read_codes(layer, self.code_bytes)
+
+    def spill_run(self, codes):
+        '''Sorts and dedups codes into a temp file run.'''
+        return write_codes(sorted(set(codes)), self.code_bytes)
+
+    def merge_runs(self, runs, layers):
+        '''Merges runs into the next layer file, dropping codes found in
+        the last two layers.'''
+        width = self.code_bytes
+        seen = merge(*(read_codes(layer, width) for layer in layers[-2:]))
+        return write_codes(difference(
+            merge(*(read_codes(run, width) for run in runs)), seen), width)
+
+    def search_bfs(self):
+        '''Plain breadth first search from the start.'''
+        self.parents = self.new_table({self.start: None})
+        states = self.new_queue([(self.start, self.occupancy(self.start))])
+        while states:
+            state, occupied = states.popleft()
+            self.visited = len(self.parents)
+            if self.is_winner(state):
+                return self.set_winner(state)
+            for cs, cs_occupied in self.expand(state, occupied):
+                if cs not in self.parents:
+                    self.parents[cs] = state
+                    states.append((cs, cs_occupied))
+
+    def search_bidirectional(self):
+        '''Breadth first search from the start and, backwards, from every
+        goal layout at once (slides are reversible), a whole layer at a
+        time on the smaller side. The first layer to meet the other side
+        gives a shortest route. Falls back to BFS when there are too many
+        goal layouts to list.'''
+        goals = self.goal_states()
+        if goals is None:
+            return self.search_bfs()
+        forward = self.parents = self.new_table({self.start: None})
+        backward = self.new_table((state, None) for state, _ in goals)
+        if self.start in backward:
+            return self.set_winner(self.start)
+        layers = [[(self.start, self.occupancy(self.start))], goals]
+        while layers[0] and layers[1]:
+            side = 0 if len(layers[0]) <= len(layers[1]) else 1
+            seen, other = (forward, backward) if side == 0 else (
+                backward, forward)
+            layer = self.new_layer()
+            meeting = None
+            for state, occupied in layers[side]:
+                self.visited = len(forward) + len(backward)
+                for cs, cs_occupied in self.expand(state, occupied):
+                    if cs not in seen:
+                        seen[cs] = state
+                        layer.append((cs, cs_occupied))
+                        if meeting is None and cs in other:
+                            meeting = cs
+            layers[side] = layer
+            self.visited = len(forward) + len(backward)
+            if meeting is not None:
+                return self.join_routes(backward, meeting)
+
+    def join_routes(self, backward, meeting):
+        '''Splices the backward chain from meeting (pointers towards a goal
+        layout) onto the forward parents and sets the winner.'''
+        state = meeting
+        while backward[state] is not None:
+            self.parents[backward[state]] = state
+            state = backward[state]
+        self.set_winner(state)
+
+    def search_astar(self):
+        '''A* over (moves so far + heuristic); states are reopened if a
+        shorter route turns up, so an admissible heuristic is enough.'''
+        push, pop = self.heap_ops()
+        occupied = self.occupancy(self.start)
+        self.parents = self.new_table({self.start: None})
+        depths = self.new_table({self.start: 0})
+        ties = count()
+        frontier = [(self.heuristic(self.start, occupied), next(ties),
+                     0, self.start, occupied)]
+        while frontier:
+            _, _, depth, state, occupied = pop(frontier)
+            if depth > depths[state]:
+                continue
+            self.visited = len(depths)
+            if self.is_winner(state):
+                return self.set_winner(state)
+            for cs, cs_occupied in self.expand(state, occupied):
+                if depth + 1 < depths.get(cs, depth + 2):
+                    depths[cs] = depth + 1
+                    self.parents[cs] = state
+                    estimate = depth + 1 + self.heuristic(cs, cs_occupied)
+                    push(frontier, (estimate, next(ties), depth + 1, cs,
+                                    cs_occupied))
+        self.visited = len(depths)
+
+    def search_idastar(self):
+        '''Iterative deepening A*: depth first passes under a rising
+        bound, so memory stays proportional to the solution depth plus a
+        capped transposition table. The table outlives each pass: it maps
+        a state to the fewest moves a finished search from it showed are
+        still needed, which cuts repeat visits within a pass and prunes
+        states reached again deeper on the next one.'''
+        path = self.new_layer([self.start])
+        on_path = self.new_set([self.start])
+        seen = self.new_table()
+
+        def dfs(state, occupied, depth, bound):
+            '''Returns the smallest estimate over the bound, or True.'''
+            estimate = depth + max(self.heuristic(state, occupied),
+                                   seen.get(state, 0))
+            if estimate > bound:
+                return estimate
+            if self.is_winner(state):
+                return True
+            self.visited = max(self.visited, len(seen) + len(path))
+            lowest = float('inf')
+            for cs, cs_occupied in self.expand(state, occupied):
+                if cs in on_path:
+                    continue
+                path.append(cs)
+                on_path.add(cs)
+                found = dfs(cs, cs_occupied, depth + 1, bound)
+                if found is True:
+                    return True
+                lowest = min(lowest, found)
+                on_path.discard(path.pop())
+            if state in seen or len(seen) < IDA_TABLE_SIZE:
+                seen[state] = lowest - depth
+            return lowest
+
+        occupied = self.occupancy(self.start)
+        bound = self.heuristic(self.start, occupied)
+        while bound != float('inf'):
+            found = dfs(self.start, occupied, 0, bound)
+            if found is True:
+                self.parents = dict(zip(path, [None] + path[:-1]))
+                return self.set_winner(path[-1])
+            bound = found
+
+    def search_external(self):
+        '''Breadth first search that keeps no visited set, for boards too
+        big to hold one in memory. Slides are reversible, so the new states
+        of a layer are the neighbours of the current one minus the current
+        and previous layers. Each layer is a temp file of sorted codes,
+        expanded a chunk at a time; neighbours are sorted into runs of
+        RUN_SIZE, spilled to disk and merged to drop duplicates. The route
+        is traced back through the layer files once a winner turns up.'''
+        layers = [write_codes([self.start], self.code_bytes)]
+        try:
+            winner = self.start if self.is_winner(self.start) else None
+            while winner is None:
+                runs = []
+                neighbours = self.new_layer()
+                for state in self.read_layer(layers[-1]):
+                    for cs, _ in self.expand(state, self.occupancy(state)):
+                        neighbours.append(cs)
+                    self.visited = max(self.visited, len(neighbours))
+                    if len(neighbours) >= RUN_SIZE:
+                        runs.append(self.spill_run(neighbours))
+                        neighbours = self.new_layer()
+                runs.append(self.spill_run(neighbours))
+                layer = self.merge_runs(runs, layers)
+                for run in runs:
+                    run.close()
+                layers.append(layer)
+                if layer.tell() == 0:
+                    return
+                for state in read_codes(layer, self.code_bytes):
+                    if self.is_winner(state):
+                        winner = state
+                        break
+            self.trace_layers(layers, winner)
+        finally:
+            for layer in layers:
+                layer.close()
+
+    def trace_layers(self, layers, state):
+        '''Rebuilds the parent pointers of one shortest route to state, the
+        last of the layer files, by finding a neighbour in each earlier
+        layer in turn.'''
+        winner = state
+        self.parents = {self.start: None}
+        for layer in reversed(layers[:-1]):
+            neighbours = {cs for cs, _ in self.get_child_states(
+                state, self.occupancy(state))}
+            codes = read_codes(layer, self.code_bytes)
+            parent = next(code for code in codes if code in neighbours)
+            self.parents[state] = parent
+            state = parent
+        self.set_winner(winner)
+
+    def goal_states(self, limit=MAX_GOAL_STATES):
+        '''Returns (state, occupancy) for every layout with R against the
+        goal and no pieces overlapping, or None if there are more than
+        limit of them.'''
+        if self.goal is None:
+            return []
+        goals = []
+        for goal in self.all_states(self.goal):
+            goals.append(goal)
+            if len(goals) > limit:
+                return None
+        return goals
+
+    def all_states(self, red_offset=None):
+        '''Yields (state, occupancy) for every layout of these pieces with
+        none overlapping, optionally with R held at one offset.'''
+        pieces = [i for i in range(len(self.labels))
+                  if red_offset is None or i != self.red]
+        state, occupied = 0, 0
+        if red_offset is not None:
+            state = red_offset << (self.red * self.bits)
+            occupied = self.masks[self.red][red_offset]
+        stack = [(0, state, occupied)]
+        while stack:
+            k, state, occupied = stack.pop()
+            if k == len(pieces):
+                yield state, occupied
+                continue
+            i = pieces[k]
+            for offset, mask in enumerate(self.masks[i]):
+                if not mask & occupied:
+                    stack.append((k + 1, state | offset << (i * self.bits),
+                                  occupied | mask))
+
+    def blockers_heuristic(self, state, occupied):
+        '''Lower bound on moves left: one for R (unless it is home) plus
+        one for every piece on the cells between R and the goal.'''
+        if self.goal is None:
+            return float('inf')
+        offset = (state >> (self.red * self.bits)) & self.mask
+        if offset == self.goal:
+            return 0
+        return 1 + len(self.get_blockers(state, offset))
+
+    def blocking_heuristic(self, state, occupied):
+        '''blockers_heuristic plus one more move when some blocker can
+        only clear R's line after a piece that isn't already counted moves
+        out of its way.'''
+        if self.goal is None:
+            return float('inf')
+        offset = (state >> (self.red * self.bits)) & self.mask
+        if offset == self.goal:
+            return 0
+        blockers = self.get_blockers(state, offset)
+        counted = self.masks[self.red][offset]
+        for i, blocker_offset in blockers:
+            counted |= self.masks[i][blocker_offset]
+        for i, blocker_offset in blockers:
+            if self.is_horiz[i] == self.is_horiz[self.red]:
+                continue    # stuck in R's line, nothing to add safely
+            cells, size = self.cells[i], self.sizes[i]
+            line = self.fixed[self.red]
+            # slide back until the piece ends before R's line...
+            back = line - size
+            if back >= 0 and not (occupied & ~counted
+                                  & sum(cells[back:blocker_offset])):
+                continue
+            # ...or forward until it starts after it
+            ahead = line + 1
+            if ahead + size <= len(cells) and not (
+                    occupied & ~counted
+                    & sum(cells[blocker_offset + size:ahead + size])):
+                continue
+            return 2 + len(blockers)
+        return 1 + len(blockers)
+
+    def get_blockers(self, state, offset):
+        '''Returns (piece, offset) for every piece covering a cell R still
+        has to pass through.'''
+        size = self.sizes[self.red]
+        path = sum(self.cells[self.red][offset + size:self.goal + size])
+        return [(i, piece_offset)
+                for i, piece_offset in enumerate(self.decode(state))
+                if i != self.red and self.masks[i][piece_offset] & path]
+
+    def set_winner(self, state):
+        '''Records the winning state and rebuilds its moves by walking
+        parent pointers back to the start.'''
+        self.winner = state
+        self.moves = list()
+        while self.parents[state] is not None:
+            parent = self.parents[state]
+            self.moves.append(self.get_move(parent, state))
+            state = parent
+        self.moves.reverse()
+        # required as we just get R to the edge, not the exit
+        if self.moves and self.moves[-1].piece == 'R':
+            self.moves[-1].scalar += 1
+        else:
+            self.moves.append(Move('R', 1))
+
+    def get_move(self, parent, child):
+        '''The Move taking one state to an adjacent one.'''
+        for i, (old, new) in enumerate(zip(self.decode(parent),
+                                           self.decode(child))):
+            if old != new:
+                return Move(self.labels[i], new - old)
                     
+    def render(self, state):
+        '''Converts a state back into the layout syntax PuzzleState
+        parses.'''
+        rows = [['.'] * self.width for _ in range(self.height)]
+        for i, offset in enumerate(self.decode(state)):
+            for j in range(self.sizes[i]):
+                y, x = self.cell(i, offset + j)
+                rows[y][x] = self.labels[i]
+        rows[self.goal_pos.y].insert(self.goal_pos.x, '>')
+        return '\n'.join(''.join(row) for row in rows)
+
     def display(self):
         '''Print the winner.'''
         print()
         if self.winner is None:
             print("No winning moves found.")
         else:
-            for move in self.winner.moves:
+            for move in self.moves:
                 print(move)
         
 class PuzzleState(object):
@@ -102,7 +625,6 @@ class PuzzleState(object):
         self.goal = None
         self.width = 0
         self.height = 0
-        self.moves = list()
         self.parse(input)
         
         assert self.goal is not None, "Goal was not found in puzzle."
@@ -130,58 +652,7 @@ class PuzzleState(object):
                     self.pieces[char].size += 1
                     self.pieces[char].is_horiz = (char == prev)
                 prev = char
-        
-    def get_position_contents(self, pos):
-        '''Returns the piece at the given position, or None.'''
-        for k, piece in self.pieces.items():
-            if (piece.pos.x <= pos.x <= piece.end.x 
-              and piece.pos.y <= pos.y <= piece.end.y):
-                return piece
-        return None
-        
-    def get_child_states(self):
-        '''Returns a list of child states possible.'''
-        states = []
-        max_moves = max(self.width, self.height)
-        for k, piece in self.pieces.items():
-            for direction in (-1,1):
-                offset = direction
-                is_valid = True
-                while is_valid:
-                    pos = piece.get_new_pos(offset)
-                    is_valid = self.is_valid_pos(pos)
-                    if is_valid:
-                        states.append(self.make_state(Move(k, offset)))
-                    offset += direction
-        return states
-            
-    def is_valid_pos(self, pos):
-        '''See's if a position is a valid move (in-bounds and empty).'''
-        if 0 <= pos.y < self.height and 0 <= pos.x < self.width:
-            if self.get_position_contents(pos) is None:
-                return True
-        return False
-        
-    def make_state(self, move):
-        state = deepcopy(self)
-        state.move_piece(move)
-        return state
-        
-    def move_piece(self, move):
-        '''Document and perform a move'''
-        self.moves.append(move)
-        piece = self.pieces[move.piece]
-        piece.move(move.scalar)
-    
-    def __str__(self):
-        '''Converts to string - used for state tracking.'''
-        state = []
-        for key in sorted(self.pieces.keys()):
-            piece = self.pieces[key]
-            state.append("{}({},{},{})".format(key, piece.pos.y, 
-                piece.pos.x, 0 if piece.is_horiz else 1))
-        return ":".join(state)
-        
+
 class PuzzlePiece(object):
     def __init__(self, label='_', pos=Position(0,0), size=1, is_horiz=True):
         '''Constructor!'''
@@ -189,50 +660,198 @@ class PuzzlePiece(object):
         self.pos = pos
         self.size = size
         self.is_horiz = is_horiz
-        
-    @property
-    def end(self):
-        '''Returns the end position of the piece.'''
-        y, x = self.pos
-        if self.is_horiz:
-            x += self.size - 1
-        else:
-            y += self.size - 1
-        return Position(y, x)
-    
-    def get_new_pos(self, scalar):
-        '''Returns the important position from a given move amount'''
-        y, x = self.pos
-        if scalar > 0:
-            y, x = self.end
-        if self.is_horiz:
-            x += scalar
-        else:
-            y += scalar
-        return Position(y, x)
-        
-    def move(self, scalar):
-        '''Move the piece the given move amount.'''
-        y, x = self.pos
-        if self.is_horiz:
-            x += scalar
-        else:
-            y += scalar
-        self.pos = Position(y, x)
-        
-    def __str__(self):
-        '''Convert to string.'''
-        return "{} {} {} {}".format(    
-            self.label, self.pos, self.size, self.is_horiz)
+
+class DistanceTable(object):
+    '''Retrograde analysis of one piece set: the distance to the goal of
+    every layout of those pieces, looked up by binary search over the
+    sorted state codes. Written with build and memory-mapped on load.
+
+    File layout: a JSON header line (the layout the table was built from
+    and the number of states), zero padding to 8 bytes, the sorted codes
+    as unsigned 64 bit ints, then one distance byte per code.'''
+    def __init__(self, path):
+        '''Constructor! Maps a table written by build.'''
+        with open(path, 'rb') as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        header_end = self._map.find(b'\n') + 1
+        header = json.loads(self._map[:header_end].decode())
+        self.puzzle = Puzzle(header['layout'])
+        self.size = header['states']
+        start = header_end + -header_end % 8
+        view = memoryview(self._map)
+        self.codes = view[start:start + 8 * self.size].cast('Q')
+        self.distances = view[start + 8 * self.size:
+                              start + 9 * self.size]
+
+    @staticmethod
+    def build(puzzle, path):
+        '''Lists every layout of the puzzle's pieces, runs a breadth
+        first search backwards from all the winning layouts at once and
+        writes each layout's distance (moves until R reaches the goal,
+        UNSOLVABLE if it never can) to path.'''
+        assert len(puzzle.labels) * puzzle.bits <= 64, "States too wide."
+        codes = array('Q', sorted(state for state, _ in puzzle.all_states()))
+        distances = bytearray([UNSOLVABLE]) * len(codes)
+        layer = []
+        if puzzle.goal is not None:
+            layer = list(puzzle.all_states(puzzle.goal))
+        for state, _ in layer:
+            distances[bisect_left(codes, state)] = 0
+        depth = 0
+        while layer and depth < UNSOLVABLE - 1:
+            depth += 1
+            previous, layer = layer, []
+            for state, occupied in previous:
+                for cs, cs_occupied in puzzle.get_child_states(state,
+                                                               occupied):
+                    i = bisect_left(codes, cs)
+                    if distances[i] == UNSOLVABLE:
+                        distances[i] = depth
+                        layer.append((cs, cs_occupied))
+        header = json.dumps({'layout': puzzle.render(puzzle.start),
+                             'states': len(codes)}).encode() + b'\n'
+        with open(path, 'wb') as handle:
+            handle.write(header + bytes(-len(header) % 8))
+            handle.write(codes.tobytes())
+            handle.write(distances)
+
+    def close(self):
+        '''Unmaps the file.'''
+        self.codes.release()
+        self.distances.release()
+        self._map.close()
+
+    def encode(self, layout):
+        '''Encodes a layout string, which must use this table's piece
+        set, as a state code.'''
+        puzzle = Puzzle(layout)
+        for attr in ('labels', 'is_horiz', 'sizes', 'fixed', 'width',
+                     'height', 'goal'):
+            assert getattr(puzzle, attr) == getattr(self.puzzle, attr), (
+                "Layout uses a different piece set ({}).".format(attr))
+        return puzzle.start
+
+    def distance(self, layout):
+        '''Moves needed to bring R to the goal from a layout (string or
+        state code), or None if it can't get there.'''
+        state = layout if isinstance(layout, int) else self.encode(layout)
+        i = bisect_left(self.codes, state)
+        assert i < self.size and self.codes[i] == state, "Invalid layout."
+        if self.distances[i] == UNSOLVABLE:
+            return None
+        return self.distances[i]
+
+    def hardest(self, count=10):
+        '''Returns (distance, layout) for the count solvable layouts
+        furthest from the goal.'''
+        ranked = sorted((distance, i)
+                        for i, distance in enumerate(self.distances)
+                        if distance != UNSOLVABLE)[-count:]
+        return [(distance, self.puzzle.render(self.codes[i]))
+                for distance, i in reversed(ranked)]
 
 def main(puzzle):
-    import time
     start = time.time()
     p = Puzzle(puzzle)
     p.solve()
     p.display()
     print("\nSeconds: {:.3f}, Moves: {}".format(
-        time.time() - start, len(p.winner.moves)))
+        time.time() - start, len(p.moves)))
+
+def read_puzzles(path):
+    '''Yields each layout in a puzzle file - blocks in the same syntax
+    PuzzleState.parse accepts, separated by blank lines.'''
+    with open(path) as handle:
+        block = []
+        for line in handle:
+            if line.strip():
+                block.append(line.strip())
+            elif block:
+                yield '\n'.join(block)
+                block = []
+        if block:
+            yield '\n'.join(block)
+
+def solve_one(index, puzzle, strategy='bfs', heuristic='blocking',
+              max_states=None, timeout=None):
+    '''Solves a single layout and reports the outcome as a dict.'''
+    start = time.time()
+    result = {'puzzle': index, 'status': 'solved', 'moves': None,
+              'depth': None, 'expanded': 0}
+    p = None
+    try:
+        p = Puzzle(puzzle)
+        p.solve(strategy, heuristic, max_states, timeout)
+    except AssertionError as e:
+        result['status'] = 'invalid'
+        result['error'] = str(e)
+    except SearchLimit as e:
+        result['status'] = 'limit'
+        result['error'] = str(e)
+    except Exception as e:
+        # one bad board mustn't take the rest of a batch down with it
+        result['status'] = 'error'
+        result['error'] = '{}: {}'.format(type(e).__name__, e)
+    else:
+        if p.winner is None:
+            result['status'] = 'unsolvable'
+        else:
+            result['moves'] = [str(move) for move in p.moves]
+            result['depth'] = len(p.moves)
+    if p is not None:
+        result['expanded'] = p.expanded
+    result['seconds'] = round(time.time() - start, 6)
+    return result
+
+def solve_batch(path, out=sys.stdout, workers=None, **options):
+    '''Solves every puzzle in a file across a process pool, writing one
+    JSON line per puzzle (numbered from 0 in file order) as each one
+    finishes. options are passed on to solve_one. A puzzle whose worker
+    fails outright is reported with status 'error'.'''
+    with ProcessPoolExecutor(workers) as pool:
+        futures = {pool.submit(solve_one, index, puzzle, **options): index
+                   for index, puzzle in enumerate(read_puzzles(path))}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'puzzle': futures[future], 'status': 'error',
+                          'error': '{}: {}'.format(type(e).__name__, e)}
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+
+def batch_main(args):
+    '''Command line entry point for solve_batch.'''
+    parser = argparse.ArgumentParser(
+        description='Solve a file of Rush Hour puzzles to JSON lines.')
+    parser.add_argument('path')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--strategy', default='bfs')
+    parser.add_argument('--heuristic', default='blocking')
+    parser.add_argument('--max-states', type=int)
+    parser.add_argument('--timeout', type=float,
+                        help='seconds allowed per puzzle')
+    options = parser.parse_args(args)
+    solve_batch(options.path, workers=options.workers,
+                strategy=options.strategy, heuristic=options.heuristic,
+                max_states=options.max_states, timeout=options.timeout)
+
+def table_main(args):
+    '''Command line entry point for DistanceTable: builds a table from the
+    layout in a file, then prints the hardest layouts of its piece set.'''
+    parser = argparse.ArgumentParser(
+        description='Build a Rush Hour distance table for a piece set.')
+    parser.add_argument('layout', help='file holding one layout')
+    parser.add_argument('table')
+    parser.add_argument('--hardest', type=int, default=3)
+    options = parser.parse_args(args)
+    with open(options.layout) as handle:
+        DistanceTable.build(Puzzle(handle.read()), options.table)
+    table = DistanceTable(options.table)
+    print("{} layouts".format(table.size))
+    for distance, layout in table.hardest(options.hardest):
+        print("{} moves:\n{}\n".format(distance, layout))
+    table.close()
     
 if __name__ == "__main__":
     puzzle1 = '''GAA..Y
@@ -241,7 +860,7 @@ if __name__ == "__main__":
                  ..VZZZ
                  ....B.
                  WWW.B.'''
-    # 5.503s - 17 moves
+    # 0.012s - 17 moves (5.503s before packed states and bitboards)
     
     puzzle2 = '''TTTAU.
                  ...AU.
@@ -249,7 +868,7 @@ if __name__ == "__main__":
                  CDDFFB
                  CEEG.H
                  VVVG.H'''
-    # 2.697 - 7 moves
+    # 0.007 - 7 moves (was 2.697)
                  
     puzzle3 = '''QQQWEU
                 TYYWEU
@@ -257,7 +876,7 @@ if __name__ == "__main__":
                 IIO...
                 .PO.AA
                 .PSSDD'''
-    # 142.212 - 49 moves
+    # 0.172 - 49 moves (was 142.212)
     
     
     puzzle4 = '''..ABBC
@@ -266,12 +885,17 @@ if __name__ == "__main__":
                 ...EFF
                 GHHE..
                 G..EII'''
-    # 59.128 - 33 moves
+    # 0.072 - 33 moves (was 59.128)
 
     puzzle5 = '''..............
                  GGGGGGW.......
                  RRB...........>
                  ..B...........'''
-    # 0.198 - 4 moves (single-width cars are assumed horizontal)
+    # 0.001 - 4 moves (single-width cars are assumed horizontal)
     
-    main(puzzle5)
+    if sys.argv[1:2] == ['table']:
+        table_main(sys.argv[2:])
+    elif len(sys.argv) > 1:
+        batch_main(sys.argv[1:])
+    else:
+        main(puzzle5)